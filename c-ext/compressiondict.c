@@ -282,6 +282,8 @@ ZstdCompressionDict_precompute_compress(ZstdCompressionDict *self,
         return NULL;
     }
 
+    self->cParams = cParams;
+
     Py_RETURN_NONE;
 }
 
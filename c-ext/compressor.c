@@ -46,6 +46,59 @@ int setup_cctx(ZstdCompressor *compressor) {
     return 0;
 }
 
+/**
+ * Resolve the compression parameters zstd uses when streaming data of unknown
+ * size.
+ */
+static ZSTD_compressionParameters stream_cparams(ZSTD_CCtx_params *params) {
+    ZSTD_compressionParameters cParams;
+    int level = 0;
+    int windowLog = 0;
+    int strategy = 0;
+
+    ZSTD_CCtxParams_getParameter(params, ZSTD_c_compressionLevel, &level);
+    cParams = ZSTD_getCParams(level, ZSTD_CONTENTSIZE_UNKNOWN, 0);
+
+    ZSTD_CCtxParams_getParameter(params, ZSTD_c_windowLog, &windowLog);
+    if (windowLog) {
+        cParams.windowLog = windowLog;
+    }
+
+    ZSTD_CCtxParams_getParameter(params, ZSTD_c_strategy, &strategy);
+    if (strategy) {
+        cParams.strategy = strategy;
+    }
+
+    return cParams;
+}
+
+/**
+ * Obtain the window log zstd may use when compressing with a precomputed
+ * dictionary.
+ *
+ * A precomputed dictionary carries no compression level, so zstd may derive
+ * the window from the default level. It then grows the window to also hold
+ * the dictionary content.
+ */
+static unsigned dict_window_log(unsigned windowLog, ZstdCompressionDict *dict) {
+    unsigned long long windowSize;
+    unsigned defaultWindowLog =
+        ZSTD_getCParams(0, ZSTD_CONTENTSIZE_UNKNOWN, 0).windowLog;
+
+    if (defaultWindowLog > windowLog) {
+        windowLog = defaultWindowLog;
+    }
+
+    windowSize = (1ULL << windowLog) + dict->dictSize - 1;
+    windowLog = 0;
+    while (windowSize) {
+        windowLog++;
+        windowSize >>= 1;
+    }
+
+    return windowLog > ZSTD_WINDOWLOG_MAX ? ZSTD_WINDOWLOG_MAX : windowLog;
+}
+
 static PyObject *frame_progression(ZSTD_CCtx *cctx) {
     PyObject *result = NULL;
     PyObject *value;
@@ -94,6 +147,7 @@ static int ZstdCompressor_init(ZstdCompressor *self, PyObject *args,
                              "write_content_size",
                              "write_dict_id",
                              "threads",
+                             "static_workspace",
                              NULL};
 
     int level = 3;
@@ -103,12 +157,14 @@ static int ZstdCompressor_init(ZstdCompressor *self, PyObject *args,
     PyObject *writeContentSize = NULL;
     PyObject *writeDictID = NULL;
     int threads = 0;
-
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|iO!O!OOOi:ZstdCompressor",
-                                     kwlist, &level, &ZstdCompressionDictType,
-                                     &dict, &ZstdCompressionParametersType,
-                                     &params, &writeChecksum, &writeContentSize,
-                                     &writeDictID, &threads)) {
+    int staticWorkspace = 0;
+    size_t workspaceSize;
+
+    if (!PyArg_ParseTupleAndKeywords(
+            args, kwargs, "|iO!O!OOOip:ZstdCompressor", kwlist, &level,
+            &ZstdCompressionDictType, &dict, &ZstdCompressionParametersType,
+            &params, &writeChecksum, &writeContentSize, &writeDictID, &threads,
+            &staticWorkspace)) {
         return -1;
     }
 
@@ -122,14 +178,6 @@ static int ZstdCompressor_init(ZstdCompressor *self, PyObject *args,
         threads = cpu_count();
     }
 
-    /* We create a ZSTD_CCtx for reuse among multiple operations to reduce the
-       overhead of each compression operation. */
-    self->cctx = ZSTD_createCCtx();
-    if (!self->cctx) {
-        PyErr_NoMemory();
-        return -1;
-    }
-
     /* TODO stuff the original parameters away somewhere so we can reset later.
        This will allow us to do things like automatically adjust cparams based
        on input size (assuming zstd isn't doing that internally). */
@@ -165,6 +213,19 @@ static int ZstdCompressor_init(ZstdCompressor *self, PyObject *args,
         return -1;
     }
 
+    if (staticWorkspace && threads) {
+        PyErr_SetString(PyExc_ValueError,
+                        "cannot define static_workspace and threads");
+        return -1;
+    }
+
+    if (staticWorkspace && dict && !dict->cdict) {
+        PyErr_SetString(PyExc_ValueError,
+                        "static_workspace requires a dictionary prepared with "
+                        "precompute_compress()");
+        return -1;
+    }
+
     if (params) {
         if (set_parameters(self->params, params)) {
             return -1;
@@ -198,6 +259,72 @@ static int ZstdCompressor_init(ZstdCompressor *self, PyObject *args,
         }
     }
 
+    if (staticWorkspace) {
+        ZSTD_compressionParameters cParams = stream_cparams(self->params);
+        unsigned windowLog = cParams.windowLog;
+        int enableLdm = 0;
+
+        if (dict) {
+            windowLog = dict_window_log(windowLog, dict);
+        }
+
+        /* zstd also enables long distance matching by itself for 128 MiB
+           windows with the optimal parsers. 1.4.8 doesn't adjust its
+           parameters before estimating their size and divides by zero. */
+        ZSTD_CCtxParams_getParameter(
+            self->params, ZSTD_c_enableLongDistanceMatching, &enableLdm);
+        if (enableLdm || (windowLog >= 27 && cParams.strategy >= ZSTD_btopt)) {
+            PyErr_SetString(
+                PyExc_ValueError,
+                "static_workspace does not support long distance matching");
+            return -1;
+        }
+
+        /* The estimate assumes an unknown source size, which covers the
+           largest window the parameters allow, plus streaming buffers. */
+        workspaceSize = ZSTD_estimateCStreamSize_usingCCtxParams(self->params);
+
+        /* With a dictionary, the match state uses the dictionary's
+           parameters. Error codes are larger than any valid size and are
+           preserved. */
+        if (dict) {
+            size_t dictWorkspaceSize;
+
+            cParams = dict->cParams;
+            cParams.windowLog = windowLog;
+            dictWorkspaceSize = ZSTD_estimateCStreamSize_usingCParams(cParams);
+            if (dictWorkspaceSize > workspaceSize) {
+                workspaceSize = dictWorkspaceSize;
+            }
+        }
+
+        if (ZSTD_isError(workspaceSize)) {
+            PyErr_Format(ZstdError,
+                         "cannot estimate static workspace size: %s",
+                         ZSTD_getErrorName(workspaceSize));
+            return -1;
+        }
+
+        /* PyMem_Malloc() satisfies the 8-byte alignment zstd requires. */
+        self->workspace = PyMem_Malloc(workspaceSize);
+        if (!self->workspace) {
+            PyErr_NoMemory();
+            return -1;
+        }
+
+        self->cctx = ZSTD_initStaticCCtx(self->workspace, workspaceSize);
+    }
+    else {
+        /* We create a ZSTD_CCtx for reuse among multiple operations to reduce
+           the overhead of each compression operation. */
+        self->cctx = ZSTD_createCCtx();
+    }
+
+    if (!self->cctx) {
+        PyErr_NoMemory();
+        return -1;
+    }
+
     if (dict) {
         self->dict = dict;
         Py_INCREF(dict);
@@ -211,7 +338,14 @@ static int ZstdCompressor_init(ZstdCompressor *self, PyObject *args,
 }
 
 static void ZstdCompressor_dealloc(ZstdCompressor *self) {
-    if (self->cctx) {
+    if (self->workspace) {
+        /* A static context lives in the workspace and can't be freed by
+           zstd. Freeing the workspace releases it. */
+        self->cctx = NULL;
+        PyMem_Free(self->workspace);
+        self->workspace = NULL;
+    }
+    else if (self->cctx) {
         ZSTD_freeCCtx(self->cctx);
         self->cctx = NULL;
     }
@@ -538,6 +672,41 @@ finally:
     return output;
 }
 
+static PyObject *ZstdCompressor_compress_into(ZstdCompressor *self,
+                                              PyObject *args,
+                                              PyObject *kwargs) {
+    static char *kwlist[] = {"data", "dst", NULL};
+
+    Py_buffer source;
+    Py_buffer dest;
+    size_t zresult;
+    PyObject *result = NULL;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*w*:compress_into",
+                                     kwlist, &source, &dest)) {
+        return NULL;
+    }
+
+    /* ZSTD_compress2() honors the parameters and dictionary attached to the
+       context, just like the streaming API used by compress(). */
+    Py_BEGIN_ALLOW_THREADS zresult =
+        ZSTD_compress2(self->cctx, dest.buf, dest.len, source.buf, source.len);
+    Py_END_ALLOW_THREADS
+
+        if (ZSTD_isError(zresult)) {
+        PyErr_Format(ZstdError, "cannot compress: %s",
+                     ZSTD_getErrorName(zresult));
+        goto finally;
+    }
+
+    result = PyLong_FromSize_t(zresult);
+
+finally:
+    PyBuffer_Release(&source);
+    PyBuffer_Release(&dest);
+    return result;
+}
+
 static ZstdCompressionObj *ZstdCompressor_compressobj(ZstdCompressor *self,
                                                       PyObject *args,
                                                       PyObject *kwargs) {
@@ -1473,6 +1642,8 @@ static PyMethodDef ZstdCompressor_methods[] = {
      METH_VARARGS | METH_KEYWORDS, NULL},
     {"compress", (PyCFunction)ZstdCompressor_compress,
      METH_VARARGS | METH_KEYWORDS, NULL},
+    {"compress_into", (PyCFunction)ZstdCompressor_compress_into,
+     METH_VARARGS | METH_KEYWORDS, NULL},
     {"compressobj", (PyCFunction)ZstdCompressor_compressobj,
      METH_VARARGS | METH_KEYWORDS, NULL},
     {"copy_stream", (PyCFunction)ZstdCompressor_copy_stream,
@@ -14,6 +14,9 @@ static void ZstdDecompressionWriter_dealloc(ZstdDecompressionWriter *self) {
     Py_XDECREF(self->decompressor);
     Py_XDECREF(self->writer);
 
+    PyMem_Free(self->output.dst);
+    self->output.dst = NULL;
+
     PyObject_Del(self);
 }
 
@@ -59,7 +62,6 @@ static PyObject *ZstdDecompressionWriter_write(ZstdDecompressionWriter *self,
     Py_buffer source;
     size_t zresult = 0;
     ZSTD_inBuffer input;
-    ZSTD_outBuffer output;
     PyObject *res;
     Py_ssize_t totalWrite = 0;
 
@@ -73,13 +75,7 @@ static PyObject *ZstdDecompressionWriter_write(ZstdDecompressionWriter *self,
         return NULL;
     }
 
-    output.dst = PyMem_Malloc(self->outSize);
-    if (!output.dst) {
-        PyErr_NoMemory();
-        goto finally;
-    }
-    output.size = self->outSize;
-    output.pos = 0;
+    self->output.pos = 0;
 
     input.src = source.buf;
     input.size = source.len;
@@ -87,30 +83,28 @@ static PyObject *ZstdDecompressionWriter_write(ZstdDecompressionWriter *self,
 
     while (input.pos < (size_t)source.len) {
         Py_BEGIN_ALLOW_THREADS zresult =
-            ZSTD_decompressStream(self->decompressor->dctx, &output, &input);
+            ZSTD_decompressStream(self->decompressor->dctx, &self->output,
+                                  &input);
         Py_END_ALLOW_THREADS
 
             if (ZSTD_isError(zresult)) {
-            PyMem_Free(output.dst);
             PyErr_Format(ZstdError, "zstd decompress error: %s",
                          ZSTD_getErrorName(zresult));
             goto finally;
         }
 
-        if (output.pos) {
-            res = PyObject_CallMethod(self->writer, "write", "y#", output.dst,
-                                      output.pos);
+        if (self->output.pos) {
+            res = PyObject_CallMethod(self->writer, "write", "y#",
+                                      self->output.dst, self->output.pos);
             if (NULL == res) {
                 goto finally;
             }
             Py_XDECREF(res);
-            totalWrite += output.pos;
-            output.pos = 0;
+            totalWrite += self->output.pos;
+            self->output.pos = 0;
         }
     }
 
-    PyMem_Free(output.dst);
-
     if (self->writeReturnRead) {
         result = PyLong_FromSize_t(input.pos);
     }
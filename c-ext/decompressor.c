@@ -11,14 +11,11 @@
 extern PyObject *ZstdError;
 
 /**
- * Ensure the ZSTD_DCtx on a decompressor is initiated and ready for a new
- * operation.
+ * Apply the decompressor's parameters and dictionary to its ZSTD_DCtx.
  */
-int ensure_dctx(ZstdDecompressor *decompressor, int loadDict) {
+static int setup_dctx(ZstdDecompressor *decompressor) {
     size_t zresult;
 
-    ZSTD_DCtx_reset(decompressor->dctx, ZSTD_reset_session_only);
-
     if (decompressor->maxWindowSize) {
         zresult = ZSTD_DCtx_setMaxWindowSize(decompressor->dctx,
                                              decompressor->maxWindowSize);
@@ -36,7 +33,7 @@ int ensure_dctx(ZstdDecompressor *decompressor, int loadDict) {
         return 1;
     }
 
-    if (loadDict && decompressor->dict) {
+    if (decompressor->dict) {
         if (ensure_ddict(decompressor->dict)) {
             return 1;
         }
@@ -54,6 +51,16 @@ int ensure_dctx(ZstdDecompressor *decompressor, int loadDict) {
     return 0;
 }
 
+/**
+ * Ensure the ZSTD_DCtx on a decompressor is ready for a new operation.
+ *
+ * Parameters and the dictionary applied by setup_dctx() survive a session
+ * reset, so only the frame state needs clearing. This can't fail.
+ */
+void ensure_dctx(ZstdDecompressor *decompressor) {
+    ZSTD_DCtx_reset(decompressor->dctx, ZSTD_reset_session_only);
+}
+
 static int Decompressor_init(ZstdDecompressor *self, PyObject *args,
                              PyObject *kwargs) {
     static char *kwlist[] = {"dict_data", "max_window_size", "format", NULL};
@@ -85,7 +92,7 @@ static int Decompressor_init(ZstdDecompressor *self, PyObject *args,
         Py_INCREF(dict);
     }
 
-    if (ensure_dctx(self, 1)) {
+    if (setup_dctx(self)) {
         goto except;
     }
 
@@ -166,10 +173,7 @@ static PyObject *Decompressor_copy_stream(ZstdDecompressor *self,
     /* Prevent free on uninitialized memory in finally. */
     output.dst = NULL;
 
-    if (ensure_dctx(self, 1)) {
-        res = NULL;
-        goto finally;
-    }
+    ensure_dctx(self);
 
     output.dst = PyMem_Malloc(outSize);
     if (!output.dst) {
@@ -266,9 +270,7 @@ PyObject *Decompressor_decompress(ZstdDecompressor *self, PyObject *args,
         return NULL;
     }
 
-    if (ensure_dctx(self, 1)) {
-        goto finally;
-    }
+    ensure_dctx(self);
 
     decompressedSize = ZSTD_getFrameContentSize(source.buf, source.len);
 
@@ -379,10 +381,7 @@ static ZstdDecompressionObj *Decompressor_decompressobj(ZstdDecompressor *self,
         return NULL;
     }
 
-    if (ensure_dctx(self, 1)) {
-        Py_DECREF(result);
-        return NULL;
-    }
+    ensure_dctx(self);
 
     result->decompressor = self;
     Py_INCREF(result->decompressor);
@@ -444,9 +443,7 @@ Decompressor_read_to_iter(ZstdDecompressor *self, PyObject *args,
     result->outSize = outSize;
     result->skipBytes = skipBytes;
 
-    if (ensure_dctx(self, 1)) {
-        goto except;
-    }
+    ensure_dctx(self);
 
     result->input.src = PyMem_Malloc(inSize);
     if (!result->input.src) {
@@ -482,9 +479,7 @@ Decompressor_stream_reader(ZstdDecompressor *self, PyObject *args,
         return NULL;
     }
 
-    if (ensure_dctx(self, 1)) {
-        return NULL;
-    }
+    ensure_dctx(self);
 
     result = (ZstdDecompressionReader *)PyObject_CallObject(
         (PyObject *)&ZstdDecompressionReaderType, NULL);
@@ -547,9 +542,7 @@ Decompressor_stream_writer(ZstdDecompressor *self, PyObject *args,
         return NULL;
     }
 
-    if (ensure_dctx(self, 1)) {
-        return NULL;
-    }
+    ensure_dctx(self);
 
     result = (ZstdDecompressionWriter *)PyObject_CallObject(
         (PyObject *)&ZstdDecompressionWriterType, NULL);
@@ -561,6 +554,15 @@ Decompressor_stream_writer(ZstdDecompressor *self, PyObject *args,
     result->closing = 0;
     result->closed = 0;
 
+    result->output.dst = PyMem_Malloc(outSize);
+    if (!result->output.dst) {
+        Py_DECREF(result);
+        return (ZstdDecompressionWriter *)PyErr_NoMemory();
+    }
+
+    result->output.pos = 0;
+    result->output.size = outSize;
+
     result->decompressor = self;
     Py_INCREF(result->decompressor);
 
@@ -599,6 +601,7 @@ Decompressor_decompress_content_dict_chain(ZstdDecompressor *self,
     PyObject *result = NULL;
     ZSTD_outBuffer outBuffer;
     ZSTD_inBuffer inBuffer;
+    int usedPrefix = 0;
 
     if (!PyArg_ParseTupleAndKeywords(args, kwargs,
                                      "O!:decompress_content_dict_chain", kwlist,
@@ -654,9 +657,7 @@ Decompressor_decompress_content_dict_chain(ZstdDecompressor *self,
         return NULL;
     }
 
-    if (ensure_dctx(self, 0)) {
-        goto finally;
-    }
+    ensure_dctx(self);
 
     buffer1Size = (size_t)frameHeader.frameContentSize;
     buffer1 = PyMem_Malloc(buffer1Size);
@@ -762,6 +763,7 @@ Decompressor_decompress_content_dict_chain(ZstdDecompressor *self,
                 buffer2 = destBuffer;
             }
 
+            usedPrefix = 1;
             Py_BEGIN_ALLOW_THREADS zresult = ZSTD_DCtx_refPrefix_advanced(
                 self->dctx, buffer1, buffer1ContentSize, ZSTD_dct_rawContent);
             Py_END_ALLOW_THREADS if (ZSTD_isError(zresult)) {
@@ -801,6 +803,7 @@ Decompressor_decompress_content_dict_chain(ZstdDecompressor *self,
                 buffer1 = destBuffer;
             }
 
+            usedPrefix = 1;
             Py_BEGIN_ALLOW_THREADS zresult = ZSTD_DCtx_refPrefix_advanced(
                 self->dctx, buffer2, buffer2ContentSize, ZSTD_dct_rawContent);
             Py_END_ALLOW_THREADS if (ZSTD_isError(zresult)) {
@@ -837,6 +840,18 @@ Decompressor_decompress_content_dict_chain(ZstdDecompressor *self,
                                               : buffer1ContentSize);
 
 finally:
+    /* Referencing a prefix clears the dictionary referenced by setup_dctx().
+       Restore it so subsequent operations use the dictionary again. */
+    if (usedPrefix && self->dict) {
+        zresult = ZSTD_DCtx_refDDict(self->dctx, self->dict->ddict);
+        if (ZSTD_isError(zresult) && result) {
+            Py_CLEAR(result);
+            PyErr_Format(ZstdError,
+                         "unable to reference prepared dictionary: %s",
+                         ZSTD_getErrorName(zresult));
+        }
+    }
+
     if (buffer2) {
         PyMem_Free(buffer2);
     }
@@ -83,6 +83,8 @@ typedef struct {
     unsigned d;
     /* Digested dictionary, suitable for reuse. */
     ZSTD_CDict *cdict;
+    /* Compression parameters cdict was created with. */
+    ZSTD_compressionParameters cParams;
     ZSTD_DDict *ddict;
 } ZstdCompressionDict;
 
@@ -101,6 +103,8 @@ typedef struct {
     ZstdCompressionDict *dict;
     /* Compression context to use. Populated during object construction. */
     ZSTD_CCtx *cctx;
+    /* Memory backing cctx when it is a static context. NULL otherwise. */
+    void *workspace;
     /* Compression parameters in use. */
     ZSTD_CCtx_params *params;
 } ZstdCompressor;
@@ -267,6 +271,7 @@ typedef struct {
 
         ZstdDecompressor *decompressor;
     PyObject *writer;
+    ZSTD_outBuffer output;
     size_t outSize;
     int entered;
     int closing;
@@ -374,7 +379,7 @@ int to_cparams(ZstdCompressionParametersObject *params,
 FrameParametersObject *get_frame_parameters(PyObject *self, PyObject *args,
                                             PyObject *kwargs);
 int ensure_ddict(ZstdCompressionDict *dict);
-int ensure_dctx(ZstdDecompressor *decompressor, int loadDict);
+void ensure_dctx(ZstdDecompressor *decompressor);
 ZstdCompressionDict *train_dictionary(PyObject *self, PyObject *args,
                                       PyObject *kwargs);
 ZstdBufferWithSegments *
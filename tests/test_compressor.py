@@ -1,3 +1,5 @@
+import io
+import os
 import unittest
 
 import zstandard as zstd
@@ -11,3 +13,100 @@ class TestCompressor(unittest.TestCase):
     def test_memory_size(self):
         cctx = zstd.ZstdCompressor(level=1)
         self.assertGreater(cctx.memory_size(), 100)
+
+    @unittest.skipIf(zstd.backend == "rust", "static_workspace not available")
+    def test_static_workspace(self):
+        source = b"foo" * 8192
+
+        cctx = zstd.ZstdCompressor(level=1)
+        expected = cctx.compress(source)
+
+        cctx = zstd.ZstdCompressor(level=1, static_workspace=True)
+        self.assertGreater(cctx.memory_size(), 100)
+
+        for i in range(2):
+            self.assertEqual(cctx.compress(source), expected)
+
+        dctx = zstd.ZstdDecompressor()
+        self.assertEqual(dctx.decompress(expected), source)
+
+        cobj = cctx.compressobj()
+        self.assertEqual(
+            dctx.decompress(
+                cobj.compress(source) + cobj.flush(),
+                max_output_size=len(source),
+            ),
+            source,
+        )
+
+        buffer = io.BytesIO()
+        with cctx.stream_writer(buffer, closefd=False) as writer:
+            writer.write(source)
+        self.assertEqual(
+            dctx.decompress(buffer.getvalue(), max_output_size=len(source)),
+            source,
+        )
+
+        with self.assertRaisesRegex(
+            ValueError, "cannot define static_workspace and threads"
+        ):
+            zstd.ZstdCompressor(threads=2, static_workspace=True)
+
+        params = zstd.ZstdCompressionParameters(window_log=27, enable_ldm=True)
+        with self.assertRaisesRegex(
+            ValueError, "static_workspace does not support long distance"
+        ):
+            zstd.ZstdCompressor(
+                compression_params=params, static_workspace=True
+            )
+
+        # zstd enables long distance matching for level 22 when streaming.
+        with self.assertRaisesRegex(
+            ValueError, "static_workspace does not support long distance"
+        ):
+            zstd.ZstdCompressor(level=22, static_workspace=True)
+
+    @unittest.skipIf(zstd.backend == "rust", "static_workspace not available")
+    def test_static_workspace_dict(self):
+        samples = []
+        for i in range(128):
+            samples.append(b"foo" * 64)
+            samples.append(b"bar" * 64)
+            samples.append(b"foobar" * 64)
+
+        d = zstd.train_dictionary(8192, samples)
+
+        with self.assertRaisesRegex(
+            ValueError, "static_workspace requires a dictionary prepared"
+        ):
+            zstd.ZstdCompressor(dict_data=d, static_workspace=True)
+
+        source = os.urandom(1048576) + b"foobar" * 349525
+
+        for dict_level in (1, 19):
+            d = zstd.ZstdCompressionDict(d.as_bytes())
+            d.precompute_compress(level=dict_level)
+            dctx = zstd.ZstdDecompressor(dict_data=d)
+
+            for level in (-5, 1, 19):
+                cctx = zstd.ZstdCompressor(
+                    level=level, dict_data=d, static_workspace=True
+                )
+
+                self.assertEqual(dctx.decompress(cctx.compress(source)), source)
+
+                cobj = cctx.compressobj()
+                frame = cobj.compress(source) + cobj.flush()
+                self.assertEqual(
+                    dctx.decompress(frame, max_output_size=len(source)), source
+                )
+
+                buffer = io.BytesIO()
+                with cctx.stream_writer(buffer, closefd=False) as writer:
+                    writer.write(source)
+                self.assertEqual(
+                    dctx.decompress(
+                        buffer.getvalue(), max_output_size=len(source)
+                    ),
+                    source,
+                )
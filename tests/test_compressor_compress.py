@@ -67,6 +67,52 @@ class TestCompressor_compress(unittest.TestCase):
             b"\x02\x09\x00\x00\x6f",
         )
 
+    def test_compress_varying_sizes(self):
+        cctx = zstd.ZstdCompressor(level=1)
+        dctx = zstd.ZstdDecompressor()
+
+        sources = [
+            b"foo" * 8192,
+            b"bar",
+            b"",
+            bytes(range(256)) * 64,
+            b"foobar" * 2,
+        ]
+
+        for source in sources * 2:
+            compressed = cctx.compress(source)
+            self.assertEqual(dctx.decompress(compressed), source)
+
+    @unittest.skipIf(zstd.backend == "rust", "compress_into not available")
+    def test_compress_into(self):
+        cctx = zstd.ZstdCompressor(level=1)
+        source = b"foo" * 8192
+        expected = cctx.compress(source)
+
+        dst = bytearray(len(expected) + 32)
+        self.assertEqual(cctx.compress_into(source, dst), len(expected))
+        self.assertEqual(dst[: len(expected)], expected)
+
+        dst = bytearray(len(source) + len(source) // 256 + 64)
+        self.assertEqual(
+            cctx.compress_into(memoryview(source), memoryview(dst)),
+            len(expected),
+        )
+        self.assertEqual(dst[: len(expected)], expected)
+
+        with self.assertRaises(TypeError):
+            cctx.compress_into(source, b"\x00" * 1024)
+
+        self.assertEqual(
+            cctx.compress_into(data=source, dst=dst), len(expected)
+        )
+
+        with self.assertRaisesRegex(zstd.ZstdError, "cannot compress"):
+            cctx.compress_into(source, bytearray(8))
+
+        # The compressor remains usable after a failure.
+        self.assertEqual(cctx.compress(source), expected)
+
     def test_negative_level(self):
         cctx = zstd.ZstdCompressor(level=-4)
         result = cctx.compress(b"foo" * 256)
@@ -165,6 +211,30 @@ class TestCompressor_compress(unittest.TestCase):
         for i in range(32):
             cctx.compress(b"foo bar foobar foo bar foobar")
 
+    def test_dict_precompute_shared(self):
+        samples = []
+        for i in range(128):
+            samples.append(b"foo" * 64)
+            samples.append(b"bar" * 64)
+            samples.append(b"foobar" * 64)
+
+        d = zstd.train_dictionary(8192, samples)
+        d.precompute_compress(level=1)
+
+        source = b"foo bar foobar foo bar foobar"
+
+        cctx = zstd.ZstdCompressor(level=1, dict_data=d)
+        expected = cctx.compress(source)
+
+        dctx = zstd.ZstdDecompressor(dict_data=d)
+        self.assertEqual(dctx.decompress(expected), source)
+
+        for i in range(8):
+            cctx = zstd.ZstdCompressor(level=1, dict_data=d)
+
+            for j in range(4):
+                self.assertEqual(cctx.compress(source), expected)
+
     def test_multithreaded(self):
         chunk_size = multithreaded_chunk_size(1)
         source = b"".join([b"x" * chunk_size, b"y" * chunk_size])
@@ -48,6 +48,24 @@ class TestCompressor_compressobj(unittest.TestCase):
         self.assertEqual(params.dict_id, 0)
         self.assertFalse(params.has_checksum)
 
+    def test_reuse_compressor(self):
+        cctx = zstd.ZstdCompressor(level=1)
+        dctx = zstd.ZstdDecompressor()
+
+        sources = [b"foo" * 8192, b"bar", bytes(range(256)) * 1024]
+
+        results = []
+        for source in sources * 2:
+            cobj = cctx.compressobj(size=len(source))
+            result = cobj.compress(source) + cobj.flush()
+            self.assertEqual(dctx.decompress(result), source)
+            results.append(result)
+
+            # Interleave one-shot compression on the same compressor.
+            cctx.compress(source)
+
+        self.assertEqual(results[: len(sources)], results[len(sources) :])
+
     def test_write_checksum(self):
         cctx = zstd.ZstdCompressor(level=1)
         cobj = cctx.compressobj()
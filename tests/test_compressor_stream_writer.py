@@ -285,6 +285,70 @@ class TestCompressor_stream_writer(unittest.TestCase):
         self.assertEqual(compressor.write(b"barbiz"), 0)
         self.assertEqual(compressor.write(b"x" * 8192), 0)
 
+    def test_many_small_writes(self):
+        source = b"".join(b"%d\n" % i for i in range(100000))
+
+        cctx = zstd.ZstdCompressor()
+        expected = cctx.compress(source)
+
+        buffer = NonClosingBytesIO()
+        with cctx.stream_writer(buffer, size=len(source)) as compressor:
+            for i in range(0, len(source), 7):
+                chunk = source[i : i + 7]
+                self.assertEqual(compressor.write(chunk), len(chunk))
+
+        self.assertEqual(buffer.getvalue(), expected)
+
+        buffer = NonClosingBytesIO()
+        with cctx.stream_writer(buffer) as compressor:
+            for i in range(0, 8192):
+                self.assertEqual(compressor.write(source[i : i + 1]), 1)
+
+            compressor.write(source[8192:])
+
+        dctx = zstd.ZstdDecompressor()
+        self.assertEqual(
+            dctx.decompress(buffer.getvalue(), max_output_size=len(source)),
+            source,
+        )
+
+        buffer = NonClosingBytesIO()
+        with cctx.stream_writer(buffer) as compressor:
+            for i in range(3):
+                compressor.write(source[i * 10 : (i + 1) * 10])
+
+            self.assertEqual(cctx.frame_progression(), (30, 0, 0))
+
+        self.assertEqual(
+            dctx.decompress(buffer.getvalue(), max_output_size=len(source)),
+            source[0:30],
+        )
+
+    def test_abandoned_writer(self):
+        cctx = zstd.ZstdCompressor()
+
+        b1 = NonClosingBytesIO()
+        writer = cctx.stream_writer(b1)
+        writer.write(b"A" * 10)
+        writer.write(b"STALE")
+
+        b2 = NonClosingBytesIO()
+        with cctx.stream_writer(b2) as compressor:
+            compressor.write(b"x" * 10000)
+            self.assertEqual(cctx.frame_progression(), (10000, 0, 0))
+
+        dctx = zstd.ZstdDecompressor()
+        self.assertEqual(
+            dctx.decompress(b2.getvalue(), max_output_size=20000),
+            b"x" * 10000,
+        )
+
+        writer.write(b"STALE")
+        self.assertEqual(
+            cctx.compress(b"foo"), zstd.ZstdCompressor().compress(b"foo")
+        )
+        self.assertEqual(cctx.frame_progression(), (3, 3, 12))
+
     def test_dictionary(self):
         samples = []
         for i in range(128):
@@ -113,3 +113,28 @@ class TestDecompressor_content_dict_chain(unittest.TestCase):
             dctx = zstd.ZstdDecompressor()
             decompressed = dctx.decompress_content_dict_chain(chain)
             self.assertEqual(decompressed, expected)
+
+    def test_dictionary_after_chain(self):
+        samples = []
+        for i in range(128):
+            samples.append(b"foo" * 64)
+            samples.append(b"bar" * 64)
+            samples.append(b"foobar" * 64)
+
+        d = zstd.train_dictionary(8192, samples)
+        source = b"foobar" * 64
+        frame = zstd.ZstdCompressor(level=1, dict_data=d).compress(source)
+
+        original = [b"foo" * 64, b"foobar" * 64]
+        chain = [
+            zstd.ZstdCompressor().compress(original[0]),
+            zstd.ZstdCompressor(
+                dict_data=zstd.ZstdCompressionDict(original[0])
+            ).compress(original[1]),
+        ]
+
+        dctx = zstd.ZstdDecompressor(dict_data=d)
+        self.assertEqual(dctx.decompress(frame), source)
+        self.assertEqual(dctx.decompress_content_dict_chain(chain), original[1])
+        # Prefix dictionaries used by the chain don't displace dict_data.
+        self.assertEqual(dctx.decompress(frame), source)
@@ -148,6 +148,24 @@ class TestDecompressor_decompress(unittest.TestCase):
             decompressed = dctx.decompress(compressed[i])
             self.assertEqual(decompressed, sources[i])
 
+    def test_dictionary_shared(self):
+        samples = []
+        for i in range(128):
+            samples.append(b"foo" * 64)
+            samples.append(b"bar" * 64)
+            samples.append(b"foobar" * 64)
+
+        d = zstd.train_dictionary(8192, samples)
+
+        source = b"foo bar foobar foo bar foobar"
+        frame = zstd.ZstdCompressor(level=1, dict_data=d).compress(source)
+
+        for i in range(8):
+            dctx = zstd.ZstdDecompressor(dict_data=d)
+
+            for j in range(4):
+                self.assertEqual(dctx.decompress(frame), source)
+
     def test_max_window_size(self):
         with open(__file__, "rb") as fh:
             source = fh.read()
@@ -164,3 +182,14 @@ class TestDecompressor_decompress(unittest.TestCase):
             "decompression error: Frame requires too much memory",
         ):
             dctx.decompress(frame, max_output_size=len(source))
+
+        # The limit stays in effect for later operations.
+        self.assertEqual(
+            dctx.decompress(cctx.compress(b"foo"), max_output_size=3), b"foo"
+        )
+
+        with self.assertRaisesRegex(
+            zstd.ZstdError,
+            "decompression error: Frame requires too much memory",
+        ):
+            dctx.decompress(frame, max_output_size=len(source))
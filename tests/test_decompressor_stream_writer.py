@@ -292,6 +292,20 @@ class TestDecompressor_stream_writer(unittest.TestCase):
             pos += 8192
         self.assertEqual(buffer.getvalue(), orig)
 
+    def test_multiple_frames(self):
+        cctx = zstd.ZstdCompressor()
+        sources = [b"foo" * 1024, b"bar" * 8192, b"", b"foobar" * 16]
+
+        buffer = io.BytesIO()
+        dctx = zstd.ZstdDecompressor()
+        with dctx.stream_writer(
+            buffer, write_size=4096, closefd=False
+        ) as decompressor:
+            for source in sources:
+                decompressor.write(cctx.compress(source))
+
+        self.assertEqual(buffer.getvalue(), b"".join(sources))
+
     def test_dictionary(self):
         samples = []
         for i in range(128):
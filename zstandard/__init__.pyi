@@ -271,9 +271,11 @@ class ZstdCompressor(object):
         write_content_size: bool = ...,
         write_dict_id: bool = ...,
         threads: int = ...,
+        static_workspace: bool = ...,
     ): ...
     def memory_size(self) -> int: ...
     def compress(self, data: ByteString) -> bytes: ...
+    def compress_into(self, data: ByteString, dst: ByteString) -> int: ...
     def compressobj(self, size: int = ...) -> ZstdCompressionObj: ...
     def chunker(
         self, size: int = ..., chunk_size: int = ...
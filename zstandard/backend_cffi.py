@@ -84,8 +84,11 @@ __all__ = [
     "FORMAT_ZSTD1_MAGICLESS",
 ]
 
+import array
+import functools
 import io
 import os
+import weakref
 
 from ._cffi import (  # type: ignore
     ffi,
@@ -102,6 +105,24 @@ DECOMPRESSION_RECOMMENDED_OUTPUT_SIZE = lib.ZSTD_DStreamOutSize()
 
 new_nonzero = ffi.new_allocator(should_clear_after_alloc=False)
 
+# Upper bound on the size of scratch buffers a compressor keeps around
+# between operations. Larger buffers are allocated per operation so a single
+# large input doesn't pin memory (not reported by memory_size()) for the
+# lifetime of the compressor.
+_MAX_RETAINED_SCRATCH_SIZE = COMPRESSION_RECOMMENDED_OUTPUT_SIZE
+
+# array.array type code whose items have the same size as ``size_t``.
+_SIZE_T_TYPECODE = [
+    t
+    for t in ("I", "L", "Q")
+    if array.array(t).itemsize == ffi.sizeof("size_t")
+][0]
+
+# Writes smaller than this to a ZstdCompressionWriter are accumulated in an
+# input buffer and handed to the compressor in bulk, avoiding a
+# ZSTD_compressStream2() call for every tiny write.
+_SMALL_WRITE_SIZE = 4096
+
 
 MAX_COMPRESSION_LEVEL = lib.ZSTD_maxCLevel()
 MAGIC_NUMBER = lib.ZSTD_MAGICNUMBER
@@ -297,6 +318,27 @@ def _zstd_error(zresult):
     return ffi.string(lib.ZSTD_getErrorName(zresult)).decode("utf-8")
 
 
+@functools.lru_cache(maxsize=128)
+def _get_cparams(level, source_size, dict_size):
+    """Obtain ``ZSTD_getCParams()`` results as a dict of keyword arguments.
+
+    Results are cached because the same few combinations tend to be requested
+    over and over and reading each struct field is a separate FFI access.
+    Callers must not mutate the returned dict.
+    """
+    params = lib.ZSTD_getCParams(level, source_size, dict_size)
+
+    return {
+        "window_log": params.windowLog,
+        "chain_log": params.chainLog,
+        "hash_log": params.hashLog,
+        "search_log": params.searchLog,
+        "min_match": params.minMatch,
+        "target_length": params.targetLength,
+        "strategy": params.strategy,
+    }
+
+
 def _make_cctx_params(params):
     res = lib.ZSTD_createCCtxParams()
     if res == ffi.NULL:
@@ -384,21 +426,11 @@ class ZstdCompressionParameters(object):
         :return:
            :py:class:`ZstdCompressionParameters`
         """
-        params = lib.ZSTD_getCParams(level, source_size, dict_size)
-
-        args = {
-            "window_log": "windowLog",
-            "chain_log": "chainLog",
-            "hash_log": "hashLog",
-            "search_log": "searchLog",
-            "min_match": "minMatch",
-            "target_length": "targetLength",
-            "strategy": "strategy",
-        }
-
-        for arg, attr in args.items():
+        params = _get_cparams(level, source_size, dict_size)
+
+        for arg, value in params.items():
             if arg not in kwargs:
-                kwargs[arg] = getattr(params, attr)
+                kwargs[arg] = value
 
         return ZstdCompressionParameters(**kwargs)
 
@@ -625,6 +657,35 @@ def _get_compression_parameter(params, param):
     return result[0]
 
 
+def _stream_cparams(params):
+    # The parameters zstd resolves when streaming data of unknown size.
+    level = _get_compression_parameter(params, lib.ZSTD_c_compressionLevel)
+    cparams = lib.ZSTD_getCParams(level, lib.ZSTD_CONTENTSIZE_UNKNOWN, 0)
+
+    window_log = _get_compression_parameter(params, lib.ZSTD_c_windowLog)
+    if window_log:
+        cparams.windowLog = window_log
+
+    strategy = _get_compression_parameter(params, lib.ZSTD_c_strategy)
+    if strategy:
+        cparams.strategy = strategy
+
+    return cparams
+
+
+def _dict_window_log(window_log, dict_data):
+    # A precomputed dictionary carries no compression level, so zstd may
+    # derive the window from the default level. It then grows the window to
+    # also hold the dictionary content.
+    window_log = max(
+        window_log,
+        lib.ZSTD_getCParams(0, lib.ZSTD_CONTENTSIZE_UNKNOWN, 0).windowLog,
+    )
+    window_log = ((1 << window_log) + len(dict_data) - 1).bit_length()
+
+    return min(window_log, WINDOWLOG_MAX)
+
+
 class ZstdCompressionWriter(object):
     """Writable compressing stream wrapper.
 
@@ -749,12 +810,22 @@ class ZstdCompressionWriter(object):
         self._closed = False
         self._bytes_compressed = 0
 
-        self._dst_buffer = ffi.new("char[]", write_size)
+        self._dst_buffer = compressor._borrow_out_buffer(write_size)
         self._out_buffer = ffi.new("ZSTD_outBuffer *")
         self._out_buffer.dst = self._dst_buffer
-        self._out_buffer.size = len(self._dst_buffer)
+        self._out_buffer.size = write_size
         self._out_buffer.pos = 0
 
+        self._in_buffer = ffi.new("ZSTD_inBuffer *")
+        self._in_buffer.src = ffi.NULL
+        self._in_buffer.size = 0
+        self._in_buffer.pos = 0
+
+        # Small writes are staged here. Allocated on first small write.
+        self._pending_buffer = None
+        self._pending_size = 0
+        self._ref = weakref.ref(self)
+
         zresult = lib.ZSTD_CCtx_setPledgedSrcSize(compressor._cctx, source_size)
         if lib.ZSTD_isError(zresult):
             raise ZstdError(
@@ -849,42 +920,85 @@ class ZstdCompressionWriter(object):
         if self._closed:
             raise ValueError("stream is closed")
 
-        total_write = 0
-
         data_buffer = ffi.from_buffer(data)
+        data_size = len(data_buffer)
 
-        in_buffer = ffi.new("ZSTD_inBuffer *")
-        in_buffer.src = data_buffer
-        in_buffer.size = len(data_buffer)
+        pending_buffer = self._pending_buffer
+
+        if (
+            data_size < _SMALL_WRITE_SIZE
+            and pending_buffer is not None
+            and self._pending_size + data_size <= len(pending_buffer)
+        ):
+            ffi.memmove(
+                pending_buffer + self._pending_size, data_buffer, data_size
+            )
+            self._pending_size += data_size
+            self._compressor._pending_writer = self._ref
+
+            return data_size if self._write_return_read else 0
+
+        total_write = self._write_pending()
+        total_write += self._compress_input(data_buffer, data_size)
+
+        # The first write always reaches zstd so the compression session is
+        # initialized eagerly. Only stage small writes after that.
+        if data_size < _SMALL_WRITE_SIZE and pending_buffer is None:
+            self._pending_buffer = new_nonzero(
+                "char[]", COMPRESSION_RECOMMENDED_INPUT_SIZE
+            )
+
+        if self._write_return_read:
+            return data_size
+        else:
+            return total_write
+
+    def _write_pending(self):
+        """Send staged small writes to the compressor."""
+        if not self._pending_size:
+            return 0
+
+        size = self._pending_size
+        self._pending_size = 0
+
+        compressor = self._compressor
+        if compressor._pending_writer is self._ref:
+            compressor._pending_writer = None
+
+        return self._compress_input(self._pending_buffer, size)
+
+    def _compress_input(self, src, size):
+        total_write = 0
+
+        in_buffer = self._in_buffer
+        in_buffer.src = src
+        in_buffer.size = size
         in_buffer.pos = 0
 
         out_buffer = self._out_buffer
         out_buffer.pos = 0
 
-        while in_buffer.pos < in_buffer.size:
+        cctx = self._compressor._cctx
+        dst_buffer = self._dst_buffer
+        write = self._writer.write
+
+        while in_buffer.pos < size:
             zresult = lib.ZSTD_compressStream2(
-                self._compressor._cctx,
-                out_buffer,
-                in_buffer,
-                lib.ZSTD_e_continue,
+                cctx, out_buffer, in_buffer, lib.ZSTD_e_continue
             )
             if lib.ZSTD_isError(zresult):
                 raise ZstdError(
                     "zstd compress error: %s" % _zstd_error(zresult)
                 )
 
-            if out_buffer.pos:
-                self._writer.write(
-                    ffi.buffer(out_buffer.dst, out_buffer.pos)[:]
-                )
-                total_write += out_buffer.pos
-                self._bytes_compressed += out_buffer.pos
+            out_size = out_buffer.pos
+            if out_size:
+                write(ffi.buffer(dst_buffer, out_size)[:])
+                total_write += out_size
+                self._bytes_compressed += out_size
                 out_buffer.pos = 0
 
-        if self._write_return_read:
-            return in_buffer.pos
-        else:
-            return total_write
+        return total_write
 
     def flush(self, flush_mode=FLUSH_BLOCK):
         """Evict data from compressor's internal state and write it to inner stream.
@@ -918,12 +1032,12 @@ class ZstdCompressionWriter(object):
         if self._closed:
             raise ValueError("stream is closed")
 
-        total_write = 0
+        total_write = self._write_pending()
 
         out_buffer = self._out_buffer
         out_buffer.pos = 0
 
-        in_buffer = ffi.new("ZSTD_inBuffer *")
+        in_buffer = self._in_buffer
         in_buffer.src = ffi.NULL
         in_buffer.size = 0
         in_buffer.pos = 0
@@ -1036,14 +1150,14 @@ class ZstdCompressionObj(object):
             raise ZstdError("cannot call compress() after compressor finished")
 
         data_buffer = ffi.from_buffer(data)
-        source = ffi.new("ZSTD_inBuffer *")
+        source = self._in
         source.src = data_buffer
         source.size = len(data_buffer)
         source.pos = 0
 
         chunks = []
 
-        while source.pos < len(data):
+        while source.pos < source.size:
             zresult = lib.ZSTD_compressStream2(
                 self._compressor._cctx, self._out, source, lib.ZSTD_e_continue
             )
@@ -1100,7 +1214,7 @@ class ZstdCompressionObj(object):
 
         assert self._out.pos == 0
 
-        in_buffer = ffi.new("ZSTD_inBuffer *")
+        in_buffer = self._in
         in_buffer.src = ffi.NULL
         in_buffer.size = 0
         in_buffer.pos = 0
@@ -1387,6 +1501,8 @@ class ZstdCompressionReader(object):
         self._in_buffer = ffi.new("ZSTD_inBuffer *")
         # Holds a ref so backing bytes in self._in_buffer stay alive.
         self._source_buffer = None
+        # Reused by every read operation, which sets its dst, size and pos.
+        self._out_buffer = ffi.new("ZSTD_outBuffer *")
 
     def __enter__(self):
         if self._entered:
@@ -1516,7 +1632,7 @@ class ZstdCompressionReader(object):
                 self._finished_input = True
 
         if lib.ZSTD_isError(zresult):
-            raise ZstdError("zstd compress error: %s", _zstd_error(zresult))
+            raise ZstdError("zstd compress error: %s" % _zstd_error(zresult))
 
         return out_buffer.pos and out_buffer.pos == out_buffer.size
 
@@ -1534,8 +1650,8 @@ class ZstdCompressionReader(object):
             return b""
 
         # Need a dedicated ref to dest buffer otherwise it gets collected.
-        dst_buffer = ffi.new("char[]", size)
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        dst_buffer = new_nonzero("char[]", size)
+        out_buffer = self._out_buffer
         out_buffer.dst = dst_buffer
         out_buffer.size = size
         out_buffer.pos = 0
@@ -1560,7 +1676,7 @@ class ZstdCompressionReader(object):
 
         if lib.ZSTD_isError(zresult):
             raise ZstdError(
-                "error ending compression stream: %s", _zstd_error(zresult)
+                "error ending compression stream: %s" % _zstd_error(zresult)
             )
 
         if zresult == 0:
@@ -1582,8 +1698,8 @@ class ZstdCompressionReader(object):
         if size == -1:
             size = COMPRESSION_RECOMMENDED_OUTPUT_SIZE
 
-        dst_buffer = ffi.new("char[]", size)
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        dst_buffer = new_nonzero("char[]", size)
+        out_buffer = self._out_buffer
         out_buffer.dst = dst_buffer
         out_buffer.size = size
         out_buffer.pos = 0
@@ -1644,7 +1760,7 @@ class ZstdCompressionReader(object):
         # TODO use writable=True once we require CFFI >= 1.12.
         dest_buffer = ffi.from_buffer(b)
         ffi.memmove(b, b"", 0)
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        out_buffer = self._out_buffer
         out_buffer.dst = dest_buffer
         out_buffer.size = len(dest_buffer)
         out_buffer.pos = 0
@@ -1667,7 +1783,7 @@ class ZstdCompressionReader(object):
 
         if lib.ZSTD_isError(zresult):
             raise ZstdError(
-                "error ending compression stream: %s", _zstd_error(zresult)
+                "error ending compression stream: %s" % _zstd_error(zresult)
             )
 
         if zresult == 0:
@@ -1686,7 +1802,7 @@ class ZstdCompressionReader(object):
         dest_buffer = ffi.from_buffer(b)
         ffi.memmove(b, b"", 0)
 
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        out_buffer = self._out_buffer
         out_buffer.dst = dest_buffer
         out_buffer.size = len(dest_buffer)
         out_buffer.pos = 0
@@ -1777,6 +1893,15 @@ class ZstdCompressor(object):
        compression operations are performed on multiple threads. The default
        value (0) disables multi-threaded compression. A value of ``-1`` means
        to set the number of threads to the number of detected logical CPUs.
+    :param static_workspace:
+       If True, the compression context is placed in a single buffer
+       allocated up front and sized for the compression parameters
+       (``ZSTD_initStaticCCtx()``), instead of zstd allocating and resizing
+       its internal state on demand. Memory usage is fixed and predictable
+       for the lifetime of the compressor. Cannot be combined with
+       multi-threaded compression or long distance matching. A dictionary
+       must be prepared with :py:meth:`ZstdCompressionDict.precompute_compress`
+       beforehand and the workspace is sized to compress with it.
     """
 
     def __init__(
@@ -1788,6 +1913,7 @@ class ZstdCompressor(object):
         write_content_size=None,
         write_dict_id=None,
         threads=0,
+        static_workspace=False,
     ):
         if level > lib.ZSTD_maxCLevel():
             raise ValueError(
@@ -1815,6 +1941,15 @@ class ZstdCompressor(object):
         if compression_params and threads:
             raise ValueError("cannot define compression_params and threads")
 
+        if static_workspace and threads:
+            raise ValueError("cannot define static_workspace and threads")
+
+        if static_workspace and dict_data and not dict_data._cdict:
+            raise ValueError(
+                "static_workspace requires a dictionary prepared with "
+                "precompute_compress()"
+            )
+
         if compression_params:
             self._params = _make_cctx_params(compression_params)
         else:
@@ -1852,12 +1987,21 @@ class ZstdCompressor(object):
                     self._params, lib.ZSTD_c_nbWorkers, threads
                 )
 
+        self._dict_data = dict_data
+        self._out_scratch = None
+        # Weak reference to the stream writer holding small writes not yet
+        # sent to the context.
+        self._pending_writer = None
+
+        if static_workspace:
+            self._init_static_cctx()
+            return
+
         cctx = lib.ZSTD_createCCtx()
         if cctx == ffi.NULL:
             raise MemoryError()
 
         self._cctx = cctx
-        self._dict_data = dict_data
 
         # We defer setting up garbage collection until after calling
         # _setup_cctx() to ensure the memory size estimate is more accurate.
@@ -1868,6 +2012,61 @@ class ZstdCompressor(object):
                 cctx, lib.ZSTD_freeCCtx, size=lib.ZSTD_sizeof_CCtx(cctx)
             )
 
+    def _init_static_cctx(self):
+        cparams = _stream_cparams(self._params)
+        window_log = cparams.windowLog
+        if self._dict_data:
+            window_log = _dict_window_log(window_log, self._dict_data)
+
+        # zstd also enables long distance matching by itself for 128 MiB
+        # windows with the optimal parsers. 1.4.8 doesn't adjust its
+        # parameters before estimating their size and divides by zero.
+        if _get_compression_parameter(
+            self._params, lib.ZSTD_c_enableLongDistanceMatching
+        ) or (window_log >= 27 and cparams.strategy >= lib.ZSTD_btopt):
+            raise ValueError(
+                "static_workspace does not support long distance matching"
+            )
+
+        # The estimate assumes an unknown source size, which covers the
+        # largest window the parameters allow, plus streaming buffers.
+        workspace_size = lib.ZSTD_estimateCStreamSize_usingCCtxParams(
+            self._params
+        )
+
+        # With a dictionary, the match state uses the dictionary's
+        # parameters. Error codes are larger than any valid size and are
+        # preserved.
+        if self._dict_data:
+            dict_cparams = ffi.new(
+                "ZSTD_compressionParameters *", self._dict_data._cparams[0]
+            )
+            dict_cparams.windowLog = window_log
+            workspace_size = max(
+                workspace_size,
+                lib.ZSTD_estimateCStreamSize_usingCParams(dict_cparams[0]),
+            )
+
+        if lib.ZSTD_isError(workspace_size):
+            raise ZstdError(
+                "cannot estimate static workspace size: %s"
+                % _zstd_error(workspace_size)
+            )
+
+        # zstd requires an 8-byte aligned workspace.
+        workspace = new_nonzero("uint64_t[]", (workspace_size + 7) // 8)
+
+        cctx = lib.ZSTD_initStaticCCtx(workspace, ffi.sizeof(workspace))
+        if cctx == ffi.NULL:
+            raise MemoryError()
+
+        # The context lives inside the workspace and can't be passed to
+        # ZSTD_freeCCtx(). Freeing the workspace releases it.
+        self._workspace = workspace
+        self._cctx = cctx
+
+        self._setup_cctx()
+
     def _setup_cctx(self):
         zresult = lib.ZSTD_CCtx_setParametersUsingCCtxParams(
             self._cctx, self._params
@@ -1886,8 +2085,8 @@ class ZstdCompressor(object):
             else:
                 zresult = lib.ZSTD_CCtx_loadDictionary_advanced(
                     self._cctx,
-                    dict_data.as_bytes(),
-                    len(dict_data),
+                    dict_data._data_buffer,
+                    len(dict_data._data_buffer),
                     lib.ZSTD_dlm_byRef,
                     dict_data._dict_type,
                 )
@@ -1898,6 +2097,43 @@ class ZstdCompressor(object):
                     % _zstd_error(zresult)
                 )
 
+    def _pending_size(self):
+        """Number of bytes staged by a stream writer in the current session."""
+        ref = self._pending_writer
+        writer = ref() if ref is not None else None
+
+        return writer._pending_size if writer is not None else 0
+
+    def _reset_session(self):
+        """Start a new compression session.
+
+        Input staged by a stream writer belongs to the old session and is
+        discarded, as zstd does with input buffered in the context.
+        """
+        ref = self._pending_writer
+        if ref is not None:
+            self._pending_writer = None
+            writer = ref()
+            if writer is not None:
+                writer._pending_size = 0
+
+        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
+
+    def _borrow_out_buffer(self, size):
+        """Obtain a scratch output buffer of at least ``size`` bytes.
+
+        The buffer is owned by the compressor and shared by operations
+        that fully drain their output before returning to the caller, so
+        it is only valid until the next operation on this compressor.
+        """
+        out = self._out_scratch
+        if out is None or len(out) < size:
+            out = new_nonzero("char[]", size)
+            if size <= _MAX_RETAINED_SCRATCH_SIZE:
+                self._out_scratch = out
+
+        return out
+
     def memory_size(self):
         """Obtain the memory usage of this compressor, in bytes.
 
@@ -1926,40 +2162,69 @@ class ZstdCompressor(object):
         >>> cctx = zstandard.ZstdCompressor()
         >>> compressed = cctx.compress(b"data to compress")
         """
-        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
-
         data_buffer = ffi.from_buffer(data)
 
         dest_size = lib.ZSTD_compressBound(len(data_buffer))
-        out = new_nonzero("char[]", dest_size)
+        out = self._borrow_out_buffer(dest_size)
 
-        zresult = lib.ZSTD_CCtx_setPledgedSrcSize(self._cctx, len(data_buffer))
-        if lib.ZSTD_isError(zresult):
-            raise ZstdError(
-                "error setting source size: %s" % _zstd_error(zresult)
-            )
+        zresult = self._compress_into(out, dest_size, data_buffer)
 
-        out_buffer = ffi.new("ZSTD_outBuffer *")
-        in_buffer = ffi.new("ZSTD_inBuffer *")
+        return ffi.buffer(out, zresult)[:]
 
-        out_buffer.dst = out
-        out_buffer.size = dest_size
-        out_buffer.pos = 0
+    def compress_into(self, data, dst):
+        """
+        Compress data in a single operation into an existing buffer.
 
-        in_buffer.src = data_buffer
-        in_buffer.size = len(data_buffer)
-        in_buffer.pos = 0
+        This is like :py:meth:`ZstdCompressor.compress` except compressed
+        data is written into a caller-provided writable buffer instead of
+        a newly allocated ``bytes``. This avoids a copy of the compressed
+        output when the destination buffer can be reused.
 
-        zresult = lib.ZSTD_compressStream2(
-            self._cctx, out_buffer, in_buffer, lib.ZSTD_e_end
+        ``dst`` must be large enough to hold the entire compressed frame.
+        If it is too small, ``ZstdError`` is raised. Compressed data can be
+        slightly larger than its input: a buffer of
+        ``len(data) + len(data) // 256 + 64`` bytes is always sufficient.
+
+        :param data:
+           Source data to compress
+        :param dst:
+           Writable object conforming to the buffer protocol to write
+           compressed data into
+        :return:
+           Integer number of bytes written into ``dst``
+
+        >>> cctx = zstandard.ZstdCompressor()
+        >>> dst = bytearray(1024)
+        >>> size = cctx.compress_into(b"data to compress", dst)
+        >>> compressed = dst[:size]
+        """
+        data_buffer = ffi.from_buffer(data)
+
+        # TODO use writable=True once we require CFFI >= 1.12.
+        dst_buffer = ffi.from_buffer(dst)
+        try:
+            ffi.memmove(dst, b"", 0)
+        except BufferError:
+            raise TypeError("dst buffer is not writable")
+
+        return self._compress_into(dst_buffer, len(dst_buffer), data_buffer)
+
+    def _compress_into(self, dst, dst_size, data_buffer):
+        if self._pending_writer is not None:
+            self._reset_session()
+
+        # ZSTD_compress2() resets the session, pledges the source size, and
+        # performs a single ZSTD_e_end pass against the persistent context.
+        # Parameters and any dictionary already attached to the context are
+        # retained across calls, so this is a single crossing into C.
+        zresult = lib.ZSTD_compress2(
+            self._cctx, dst, dst_size, data_buffer, len(data_buffer)
         )
 
         if lib.ZSTD_isError(zresult):
             raise ZstdError("cannot compress: %s" % _zstd_error(zresult))
-        elif zresult:
-            raise ZstdError("unexpected partial frame flush")
 
-        return ffi.buffer(out, out_buffer.pos)[:]
+        return zresult
 
     def compressobj(self, size=-1):
         """
@@ -1972,7 +2237,7 @@ class ZstdCompressor(object):
         :return:
            :py:class:`ZstdCompressionObj`
         """
-        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
+        self._reset_session()
 
         if size < 0:
             size = lib.ZSTD_CONTENTSIZE_UNKNOWN
@@ -1985,12 +2250,13 @@ class ZstdCompressor(object):
 
         cobj = ZstdCompressionObj()
         cobj._out = ffi.new("ZSTD_outBuffer *")
-        cobj._dst_buffer = ffi.new(
-            "char[]", COMPRESSION_RECOMMENDED_OUTPUT_SIZE
+        cobj._dst_buffer = self._borrow_out_buffer(
+            COMPRESSION_RECOMMENDED_OUTPUT_SIZE
         )
         cobj._out.dst = cobj._dst_buffer
         cobj._out.size = COMPRESSION_RECOMMENDED_OUTPUT_SIZE
         cobj._out.pos = 0
+        cobj._in = ffi.new("ZSTD_inBuffer *")
         cobj._compressor = self
         cobj._finished = False
 
@@ -2010,7 +2276,7 @@ class ZstdCompressor(object):
         :return:
            :py:class:`ZstdCompressionChunker`
         """
-        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
+        self._reset_session()
 
         if size < 0:
             size = lib.ZSTD_CONTENTSIZE_UNKNOWN
@@ -2079,7 +2345,7 @@ class ZstdCompressor(object):
         if not hasattr(ofh, "write"):
             raise ValueError("second argument must have a write() method")
 
-        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
+        self._reset_session()
 
         if size < 0:
             size = lib.ZSTD_CONTENTSIZE_UNKNOWN
@@ -2093,11 +2359,15 @@ class ZstdCompressor(object):
         in_buffer = ffi.new("ZSTD_inBuffer *")
         out_buffer = ffi.new("ZSTD_outBuffer *")
 
-        dst_buffer = ffi.new("char[]", write_size)
+        dst_buffer = self._borrow_out_buffer(write_size)
         out_buffer.dst = dst_buffer
         out_buffer.size = write_size
         out_buffer.pos = 0
 
+        # Slicing a memoryview is cheaper than creating an ffi.buffer() for
+        # every chunk written to ofh.
+        dst_view = memoryview(ffi.buffer(dst_buffer, write_size))
+
         total_read, total_write = 0, 0
 
         while True:
@@ -2106,12 +2376,13 @@ class ZstdCompressor(object):
                 break
 
             data_buffer = ffi.from_buffer(data)
-            total_read += len(data_buffer)
+            data_size = len(data_buffer)
+            total_read += data_size
             in_buffer.src = data_buffer
-            in_buffer.size = len(data_buffer)
+            in_buffer.size = data_size
             in_buffer.pos = 0
 
-            while in_buffer.pos < in_buffer.size:
+            while in_buffer.pos < data_size:
                 zresult = lib.ZSTD_compressStream2(
                     self._cctx, out_buffer, in_buffer, lib.ZSTD_e_continue
                 )
@@ -2120,9 +2391,10 @@ class ZstdCompressor(object):
                         "zstd compress error: %s" % _zstd_error(zresult)
                     )
 
-                if out_buffer.pos:
-                    ofh.write(ffi.buffer(out_buffer.dst, out_buffer.pos))
-                    total_write += out_buffer.pos
+                out_size = out_buffer.pos
+                if out_size:
+                    ofh.write(dst_view[:out_size])
+                    total_write += out_size
                     out_buffer.pos = 0
 
         # We've finished reading. Flush the compressor.
@@ -2135,9 +2407,10 @@ class ZstdCompressor(object):
                     "error ending compression stream: %s" % _zstd_error(zresult)
                 )
 
-            if out_buffer.pos:
-                ofh.write(ffi.buffer(out_buffer.dst, out_buffer.pos))
-                total_write += out_buffer.pos
+            out_size = out_buffer.pos
+            if out_size:
+                ofh.write(dst_view[:out_size])
+                total_write += out_size
                 out_buffer.pos = 0
 
             if zresult == 0:
@@ -2177,7 +2450,7 @@ class ZstdCompressor(object):
         :return:
            :py:class:`ZstdCompressionReader`
         """
-        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
+        self._reset_session()
 
         try:
             size = len(source)
@@ -2233,7 +2506,7 @@ class ZstdCompressor(object):
         if not hasattr(writer, "write"):
             raise ValueError("must pass an object with a write() method")
 
-        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
+        self._reset_session()
 
         if size < 0:
             size = lib.ZSTD_CONTENTSIZE_UNKNOWN
@@ -2324,7 +2597,7 @@ class ZstdCompressor(object):
                 "conforms to buffer protocol"
             )
 
-        lib.ZSTD_CCtx_reset(self._cctx, lib.ZSTD_reset_session_only)
+        self._reset_session()
 
         if size < 0:
             size = lib.ZSTD_CONTENTSIZE_UNKNOWN
@@ -2368,11 +2641,12 @@ class ZstdCompressor(object):
             # Feed all read data into the compressor and emit output until
             # exhausted.
             read_buffer = ffi.from_buffer(read_result)
+            input_size = len(read_buffer)
             in_buffer.src = read_buffer
-            in_buffer.size = len(read_buffer)
+            in_buffer.size = input_size
             in_buffer.pos = 0
 
-            while in_buffer.pos < in_buffer.size:
+            while in_buffer.pos < input_size:
                 zresult = lib.ZSTD_compressStream2(
                     self._cctx, out_buffer, in_buffer, lib.ZSTD_e_continue
                 )
@@ -2381,8 +2655,9 @@ class ZstdCompressor(object):
                         "zstd compress error: %s" % _zstd_error(zresult)
                     )
 
-                if out_buffer.pos:
-                    data = ffi.buffer(out_buffer.dst, out_buffer.pos)[:]
+                out_size = out_buffer.pos
+                if out_size:
+                    data = ffi.buffer(dst_buffer, out_size)[:]
                     out_buffer.pos = 0
                     yield data
 
@@ -2471,7 +2746,13 @@ class ZstdCompressor(object):
         """
         progression = lib.ZSTD_getFrameProgression(self._cctx)
 
-        return progression.ingested, progression.consumed, progression.produced
+        # Staged stream writer input hasn't reached zstd yet. zstd would
+        # have buffered it without consuming it.
+        return (
+            progression.ingested + self._pending_size(),
+            progression.consumed,
+            progression.produced,
+        )
 
 
 class FrameParameters(object):
@@ -2657,6 +2938,9 @@ class ZstdCompressionDict(object):
     def __init__(self, data, dict_type=DICT_TYPE_AUTO, k=0, d=0):
         assert isinstance(data, bytes)
         self._data = data
+        # zstd references dictionary content instead of copying it. All
+        # users share this pointer, which lives as long as the instance.
+        self._data_buffer = ffi.from_buffer(data)
         self.k = k
         self.d = d
 
@@ -2672,13 +2956,17 @@ class ZstdCompressionDict(object):
 
         self._dict_type = dict_type
         self._cdict = None
+        self._cparams = None
+        self._ddict = None
 
     def __len__(self):
         return len(self._data)
 
     def dict_id(self):
         """Obtain the integer ID of the dictionary."""
-        return int(lib.ZDICT_getDictID(self._data, len(self._data)))
+        return int(
+            lib.ZDICT_getDictID(self._data_buffer, len(self._data_buffer))
+        )
 
     def as_bytes(self):
         """Obtain the ``bytes`` representation of the dictionary."""
@@ -2699,9 +2987,12 @@ class ZstdCompressionDict(object):
             raise ValueError("must specify one of level or compression_params")
 
         if level:
-            cparams = lib.ZSTD_getCParams(level, 0, len(self._data))
+            cparams = ffi.new(
+                "ZSTD_compressionParameters *",
+                lib.ZSTD_getCParams(level, 0, len(self._data)),
+            )
         else:
-            cparams = ffi.new("ZSTD_compressionParameters")
+            cparams = ffi.new("ZSTD_compressionParameters *")
             cparams.chainLog = compression_params.chain_log
             cparams.hashLog = compression_params.hash_log
             cparams.minMatch = compression_params.min_match
@@ -2711,11 +3002,11 @@ class ZstdCompressionDict(object):
             cparams.windowLog = compression_params.window_log
 
         cdict = lib.ZSTD_createCDict_advanced(
-            self._data,
-            len(self._data),
+            self._data_buffer,
+            len(self._data_buffer),
             lib.ZSTD_dlm_byRef,
             self._dict_type,
-            cparams,
+            cparams[0],
             lib.ZSTD_defaultCMem,
         )
         if cdict == ffi.NULL:
@@ -2724,12 +3015,15 @@ class ZstdCompressionDict(object):
         self._cdict = ffi.gc(
             cdict, lib.ZSTD_freeCDict, size=lib.ZSTD_sizeof_CDict(cdict)
         )
+        self._cparams = cparams
+
+    def _ensure_ddict(self):
+        if self._ddict:
+            return
 
-    @property
-    def _ddict(self):
         ddict = lib.ZSTD_createDDict_advanced(
-            self._data,
-            len(self._data),
+            self._data_buffer,
+            len(self._data_buffer),
             lib.ZSTD_dlm_byRef,
             self._dict_type,
             lib.ZSTD_defaultCMem,
@@ -2738,12 +3032,9 @@ class ZstdCompressionDict(object):
         if ddict == ffi.NULL:
             raise ZstdError("could not create decompression dict")
 
-        ddict = ffi.gc(
+        self._ddict = ffi.gc(
             ddict, lib.ZSTD_freeDDict, size=lib.ZSTD_sizeof_DDict(ddict)
         )
-        self.__dict__["_ddict"] = ddict
-
-        return ddict
 
 
 def train_dictionary(
@@ -2839,20 +3130,22 @@ def train_dictionary(
         steps = steps or 4
         level = level or 3
 
-    total_size = sum(map(len, samples))
-
-    samples_buffer = new_nonzero("char[]", total_size)
-    sample_sizes = new_nonzero("size_t[]", len(samples))
-
-    offset = 0
-    for i, sample in enumerate(samples):
+    for sample in samples:
         if not isinstance(sample, bytes):
             raise ValueError("samples must be bytes")
 
-        l = len(sample)
-        ffi.memmove(samples_buffer + offset, sample, l)
-        offset += l
-        sample_sizes[i] = l
+    # Collect sizes in a native array and copy them over in one operation
+    # instead of assigning each size_t element through CFFI. Building the
+    # array from a list lets it preallocate instead of growing per element.
+    sizes = array.array(_SIZE_T_TYPECODE, list(map(len, samples)))
+    sample_sizes = new_nonzero("size_t[]", len(samples))
+    ffi.memmove(sample_sizes, sizes, len(samples) * ffi.sizeof("size_t"))
+
+    # Concatenate samples with a single bulk copy instead of copying each
+    # sample into a C buffer individually. zstd only reads from this buffer,
+    # so it can be referenced directly.
+    samples_data = b"".join(samples)
+    samples_buffer = ffi.from_buffer(samples_data)
 
     dict_data = new_nonzero("char[]", dict_size)
 
@@ -2871,7 +3164,7 @@ def train_dictionary(
     zresult = lib.ZDICT_optimizeTrainFromBuffer_fastCover(
         ffi.addressof(dict_data),
         dict_size,
-        ffi.addressof(samples_buffer),
+        samples_buffer,
         ffi.addressof(sample_sizes, 0),
         len(samples),
         ffi.addressof(dparams),
@@ -3077,6 +3370,8 @@ class ZstdDecompressionReader(object):
         self._in_buffer = ffi.new("ZSTD_inBuffer *")
         # Holds a ref to self._in_buffer.src.
         self._source_buffer = None
+        # Reused by every read operation, which sets its dst, size and pos.
+        self._out_buffer = ffi.new("ZSTD_outBuffer *")
 
     def __enter__(self):
         if self._entered:
@@ -3233,8 +3528,8 @@ class ZstdDecompressionReader(object):
 
         # We /could/ call into readinto() here. But that introduces more
         # overhead.
-        dst_buffer = ffi.new("char[]", size)
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        dst_buffer = new_nonzero("char[]", size)
+        out_buffer = self._out_buffer
         out_buffer.dst = dst_buffer
         out_buffer.size = size
         out_buffer.pos = 0
@@ -3263,7 +3558,7 @@ class ZstdDecompressionReader(object):
         # TODO use writable=True once we require CFFI >= 1.12.
         dest_buffer = ffi.from_buffer(b)
         ffi.memmove(b, b"", 0)
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        out_buffer = self._out_buffer
         out_buffer.dst = dest_buffer
         out_buffer.size = len(dest_buffer)
         out_buffer.pos = 0
@@ -3296,8 +3591,8 @@ class ZstdDecompressionReader(object):
         if size == -1:
             size = DECOMPRESSION_RECOMMENDED_OUTPUT_SIZE
 
-        dst_buffer = ffi.new("char[]", size)
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        dst_buffer = new_nonzero("char[]", size)
+        out_buffer = self._out_buffer
         out_buffer.dst = dst_buffer
         out_buffer.size = size
         out_buffer.pos = 0
@@ -3327,7 +3622,7 @@ class ZstdDecompressionReader(object):
         dest_buffer = ffi.from_buffer(b)
         ffi.memmove(b, b"", 0)
 
-        out_buffer = ffi.new("ZSTD_outBuffer *")
+        out_buffer = self._out_buffer
         out_buffer.dst = dest_buffer
         out_buffer.size = len(dest_buffer)
         out_buffer.pos = 0
@@ -3447,6 +3742,17 @@ class ZstdDecompressionWriter(object):
         self._closing = False
         self._closed = False
 
+        self._dst_buffer = new_nonzero("char[]", write_size)
+        self._out_buffer = ffi.new("ZSTD_outBuffer *")
+        self._out_buffer.dst = self._dst_buffer
+        self._out_buffer.size = write_size
+        self._out_buffer.pos = 0
+
+        self._in_buffer = ffi.new("ZSTD_inBuffer *")
+        self._in_buffer.src = ffi.NULL
+        self._in_buffer.size = 0
+        self._in_buffer.pos = 0
+
     def __enter__(self):
         if self._closed:
             raise ValueError("stream is closed")
@@ -3546,33 +3852,32 @@ class ZstdDecompressionWriter(object):
 
         total_write = 0
 
-        in_buffer = ffi.new("ZSTD_inBuffer *")
-        out_buffer = ffi.new("ZSTD_outBuffer *")
-
         data_buffer = ffi.from_buffer(data)
+        data_size = len(data_buffer)
+
+        in_buffer = self._in_buffer
         in_buffer.src = data_buffer
-        in_buffer.size = len(data_buffer)
+        in_buffer.size = data_size
         in_buffer.pos = 0
 
-        dst_buffer = ffi.new("char[]", self._write_size)
-        out_buffer.dst = dst_buffer
-        out_buffer.size = len(dst_buffer)
+        out_buffer = self._out_buffer
         out_buffer.pos = 0
 
         dctx = self._decompressor._dctx
+        dst_buffer = self._dst_buffer
+        write = self._writer.write
 
-        while in_buffer.pos < in_buffer.size:
+        while in_buffer.pos < data_size:
             zresult = lib.ZSTD_decompressStream(dctx, out_buffer, in_buffer)
             if lib.ZSTD_isError(zresult):
                 raise ZstdError(
                     "zstd decompress error: %s" % _zstd_error(zresult)
                 )
 
-            if out_buffer.pos:
-                self._writer.write(
-                    ffi.buffer(out_buffer.dst, out_buffer.pos)[:]
-                )
-                total_write += out_buffer.pos
+            out_size = out_buffer.pos
+            if out_size:
+                write(ffi.buffer(dst_buffer, out_size)[:])
+                total_write += out_size
                 out_buffer.pos = 0
 
         if self._write_return_read:
@@ -3627,7 +3932,7 @@ class ZstdDecompressor(object):
         # Defer setting up garbage collection until full state is loaded so
         # the memory size is more accurate.
         try:
-            self._ensure_dctx()
+            self._setup_dctx()
         finally:
             self._dctx = ffi.gc(
                 dctx, lib.ZSTD_freeDCtx, size=lib.ZSTD_sizeof_DCtx(dctx)
@@ -3920,11 +4225,12 @@ class ZstdDecompressor(object):
             # Feed all read data into decompressor and emit output until
             # exhausted.
             read_buffer = ffi.from_buffer(read_result)
+            input_size = len(read_buffer)
             in_buffer.src = read_buffer
-            in_buffer.size = len(read_buffer)
+            in_buffer.size = input_size
             in_buffer.pos = 0
 
-            while in_buffer.pos < in_buffer.size:
+            while in_buffer.pos < input_size:
                 assert out_buffer.pos == 0
 
                 zresult = lib.ZSTD_decompressStream(
@@ -3935,8 +4241,9 @@ class ZstdDecompressor(object):
                         "zstd decompress error: %s" % _zstd_error(zresult)
                     )
 
-                if out_buffer.pos:
-                    data = ffi.buffer(out_buffer.dst, out_buffer.pos)[:]
+                out_size = out_buffer.pos
+                if out_size:
+                    data = ffi.buffer(dst_buffer, out_size)[:]
                     out_buffer.pos = 0
                     yield data
 
@@ -4043,11 +4350,13 @@ class ZstdDecompressor(object):
         in_buffer = ffi.new("ZSTD_inBuffer *")
         out_buffer = ffi.new("ZSTD_outBuffer *")
 
-        dst_buffer = ffi.new("char[]", write_size)
+        dst_buffer = new_nonzero("char[]", write_size)
         out_buffer.dst = dst_buffer
         out_buffer.size = write_size
         out_buffer.pos = 0
 
+        dst_view = memoryview(ffi.buffer(dst_buffer))
+
         total_read, total_write = 0, 0
 
         # Read all available input.
@@ -4057,13 +4366,14 @@ class ZstdDecompressor(object):
                 break
 
             data_buffer = ffi.from_buffer(data)
-            total_read += len(data_buffer)
+            data_size = len(data_buffer)
+            total_read += data_size
             in_buffer.src = data_buffer
-            in_buffer.size = len(data_buffer)
+            in_buffer.size = data_size
             in_buffer.pos = 0
 
             # Flush all read data to output.
-            while in_buffer.pos < in_buffer.size:
+            while in_buffer.pos < data_size:
                 zresult = lib.ZSTD_decompressStream(
                     self._dctx, out_buffer, in_buffer
                 )
@@ -4072,9 +4382,10 @@ class ZstdDecompressor(object):
                         "zstd decompressor error: %s" % _zstd_error(zresult)
                     )
 
-                if out_buffer.pos:
-                    ofh.write(ffi.buffer(out_buffer.dst, out_buffer.pos))
-                    total_write += out_buffer.pos
+                out_size = out_buffer.pos
+                if out_size:
+                    ofh.write(dst_view[:out_size])
+                    total_write += out_size
                     out_buffer.pos = 0
 
             # Continue loop to keep reading.
@@ -4159,7 +4470,7 @@ class ZstdDecompressor(object):
         if params.frameContentSize == lib.ZSTD_CONTENTSIZE_UNKNOWN:
             raise ValueError("chunk 0 missing content size in frame")
 
-        self._ensure_dctx(load_dict=False)
+        self._ensure_dctx()
 
         last_buffer = ffi.new("char[]", params.frameContentSize)
 
@@ -4308,9 +4619,7 @@ class ZstdDecompressor(object):
         """
         raise NotImplementedError()
 
-    def _ensure_dctx(self, load_dict=True):
-        lib.ZSTD_DCtx_reset(self._dctx, lib.ZSTD_reset_session_only)
-
+    def _setup_dctx(self):
         if self._max_window_size:
             zresult = lib.ZSTD_DCtx_setMaxWindowSize(
                 self._dctx, self._max_window_size
@@ -4326,10 +4635,16 @@ class ZstdDecompressor(object):
                 "unable to set decoding format: %s" % _zstd_error(zresult)
             )
 
-        if self._dict_data and load_dict:
+        if self._dict_data:
+            self._dict_data._ensure_ddict()
             zresult = lib.ZSTD_DCtx_refDDict(self._dctx, self._dict_data._ddict)
             if lib.ZSTD_isError(zresult):
                 raise ZstdError(
                     "unable to reference prepared dictionary: %s"
                     % _zstd_error(zresult)
                 )
+
+    def _ensure_dctx(self):
+        # Parameters and the dictionary applied by _setup_dctx() survive a
+        # session reset, so only the frame state needs clearing.
+        lib.ZSTD_DCtx_reset(self._dctx, lib.ZSTD_reset_session_only)